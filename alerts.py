@@ -0,0 +1,141 @@
+import bisect
+import itertools
+import screener
+
+# Alerts that go off when a value of a stock crosses a threshold, for example when the beta of ERIC goes
+# above 1.5. The alerts are kept in sorted threshold lists per field, so when a stock is updated only the
+# alerts of the fields that changed are looked at, and only the ones between the old and new value are found.
+
+alerts_by_id = {}  # alert id -> (field, direction, threshold, ticker, strict)
+# (field, direction, strict, ticker) -> [sorted thresholds, alert ids in the same order]. ticker is None for all
+# stocks. Strict (> and <) and non-strict (>= and <=) alerts are kept apart, since a value that lands exactly on
+# the threshold only sets off the non-strict ones.
+alert_index = {}
+alert_ids = itertools.count(1)
+
+
+def add_alert(field, direction, threshold, ticker=None, strict=True):
+    """
+    Registers an alert.
+    :param field: one of screener.screen_fields.
+    :param direction: "above" or "below".
+    :param threshold: the value that has to be crossed.
+    :param ticker: the stock to watch, None watches every stock.
+    :param strict: True if the value has to pass the threshold (> or <), False if reaching it is enough (>= or <=).
+    :return: the id of the alert, used to remove it.
+    """
+    if field not in screener.screen_fields:
+        raise ValueError(field + " can't be used in an alert")
+    if direction not in ("above", "below"):
+        raise ValueError("direction has to be above or below")
+
+    alert_id = next(alert_ids)
+    thresholds, ids = alert_index.setdefault((field, direction, strict, ticker), [[], []])
+    position = bisect.bisect_right(thresholds, threshold)
+    thresholds.insert(position, threshold)
+    ids.insert(position, alert_id)
+    alerts_by_id[alert_id] = (field, direction, threshold, ticker, strict)
+    return alert_id
+
+
+def add_alerts_from_text(alert_text, ticker=None):
+    """
+    Registers alerts written like a screen, "beta > 1.5" is an alert when beta goes above 1.5.
+    :param alert_text: one or several conditions separated by commas.
+    :param ticker: the stock to watch, None watches every stock.
+    :return: a list of alert ids or None if the text could not be understood.
+    """
+    conditions = screener.parse_screen(alert_text)
+    if conditions is None:
+        return None
+    for field, symbol, threshold in conditions:
+        if symbol == "==":
+            print("An alert needs a direction, use < or > instead of ==")
+            return None
+    return [add_alert(field, "above" if ">" in symbol else "below", threshold, ticker, "=" not in symbol)
+            for field, symbol, threshold in conditions]
+
+
+def remove_alert(alert_id):
+    """
+    Removes a registered alert.
+    :param alert_id: the id from add_alert.
+    :return: nothing
+    """
+    field, direction, threshold, ticker, strict = alerts_by_id.pop(alert_id)
+    key = (field, direction, strict, ticker)
+    thresholds, ids = alert_index[key]
+    position = ids.index(alert_id)
+    del thresholds[position]
+    del ids[position]
+    if not ids:  # so an empty bucket is not looked at on every update, and stock_updated can skip early again.
+        del alert_index[key]
+
+
+def crossed_alerts(field, ticker, old_value, new_value):
+    """
+    Finds the alerts of one field that the change from old_value to new_value crosses.
+    :return: a list of alert ids.
+    """
+    crossed = []
+    for direction in ("above", "below"):
+        for strict in (True, False):
+            for key in ((field, direction, strict, ticker), (field, direction, strict, None)):
+                if key not in alert_index:
+                    continue
+                thresholds, ids = alert_index[key]
+                # >: old <= threshold < new, >=: old < threshold <= new,
+                # <: new < threshold <= old, <=: new <= threshold < old
+                if direction == "above":
+                    bisect_function = bisect.bisect_left if strict else bisect.bisect_right
+                    crossed += ids[bisect_function(thresholds, old_value):bisect_function(thresholds, new_value)]
+                else:
+                    bisect_function = bisect.bisect_right if strict else bisect.bisect_left
+                    crossed += ids[bisect_function(thresholds, new_value):bisect_function(thresholds, old_value)]
+    return crossed
+
+
+def stock_updated(ticker, old_stock, new_stock):
+    """
+    Checks the alerts when a stock is loaded again. Only fields whose value changed are checked, and a
+    stock that is loaded for the first time has nothing to cross from.
+    :param ticker: the ticker of the stock.
+    :param old_stock: the Stock that is replaced (or None).
+    :param new_stock: the new Stock.
+    :return: a string with the alerts that went off (empty if none).
+    """
+    if old_stock is None or not alert_index:
+        return ""
+
+    old_metrics = screener.get_metrics(old_stock)
+    new_metrics = screener.get_metrics(new_stock)
+    gui_string_alerts = ""
+    for field in screener.screen_fields:
+        old_value = old_metrics[field]
+        new_value = new_metrics[field]
+        if old_value is None or new_value is None or old_value == new_value:
+            continue
+        for alert_id in crossed_alerts(field, ticker, old_value, new_value):
+            _, direction, threshold, _, strict = alerts_by_id[alert_id]
+            gui_string_alerts += "ALERT: " + ticker + " " + field + (" went " if strict else " reached or went ") \
+                                 + direction + " " + str(threshold) \
+                                 + " (" + str(old_value) + " -> " + str(new_value) + ")\n"
+
+    if gui_string_alerts:
+        print(gui_string_alerts)
+    return gui_string_alerts
+
+
+def list_alerts():
+    """
+    Lists the registered alerts.
+    :return: a string to the gui
+    """
+    gui_string_alerts = ""
+    for alert_id, (field, direction, threshold, ticker, strict) in alerts_by_id.items():
+        gui_string_alerts += str(alert_id) + ". " + (ticker or "All stocks") + ": " + field + " " \
+                             + ("" if strict else "at or ") + direction + " " + str(threshold) + "\n"
+    if not gui_string_alerts:
+        gui_string_alerts = "No alerts registered!\n"
+    print(gui_string_alerts)
+    return gui_string_alerts
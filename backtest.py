@@ -0,0 +1,125 @@
+import history
+import screener
+
+# Replays a screen over the stored price history (see history.py) of the loaded stocks. At every rebalance day
+# the screen is evaluated with the change and beta the stocks had on that day, and the stocks that pass are held
+# with equal weights until the next rebalance. The ratios (P/E, P/S, debt/equity) are only stored for today, so
+# those are the same on every day.
+
+
+def line_up(stored, dates):
+    """
+    Lines up the stored history of one ticker with the given dates. A missing day gets the price before it.
+    :param stored: the price history of the ticker.
+    :param dates: the dates to line up with, from old to recent.
+    :return: a list with the price of every date, None before the history starts.
+    """
+    if stored["dates"] == dates:  # traded every day, nothing to fill in.
+        return stored["prices"]
+    price_of_date = dict(zip(stored["dates"], stored["prices"]))
+    prices = []
+    price = None
+    for date in dates:
+        price = price_of_date.get(date, price)
+        prices.append(price)
+    return prices
+
+
+def get_price_table(list_of_tickers, price_history):
+    """
+    Lines up the price history of the tickers by date.
+    :param list_of_tickers: the tickers to line up.
+    :param price_history: the stored price history.
+    :return: a list of tickers (the ones with history), a list of dates from old to recent and a list with the
+    prices of every ticker (see line_up).
+    """
+    tickers = [ticker for ticker in list_of_tickers if ticker in price_history]
+    dates = sorted(set().union(*(price_history[ticker]["dates"] for ticker in tickers)))
+    return tickers, dates, [line_up(price_history[ticker], dates) for ticker in tickers]
+
+
+def backtest(dict_of_stocks, screen, rebalance_days=21, lookback_days=21, price_history=None):
+    """
+    Simulates an equal weight portfolio that holds the stocks passing the screen, rebalanced every
+    rebalance_days. Days where no stock passes are spent in cash.
+    :param dict_of_stocks: the stocks loaded in the program.
+    :param screen: a parsed screen (see screener.parse_screen).
+    :param rebalance_days: how many trading days between every rebalance.
+    :param lookback_days: how many trading days back "change" and "beta" are calculated on a rebalance day.
+    :param price_history: the stored price history, read from file if not given.
+    :return: a dictionary with the dates, the daily portfolio value ("equity", starting at 1), the holdings of
+    every rebalance ("holdings", a list of (date, tickers)) and the total return in percent, or None if there is
+    not enough history.
+    """
+    if price_history is None:
+        price_history = history.load_price_history()
+    tickers, dates, prices = get_price_table(list(dict_of_stocks), price_history)
+    if len(dates) <= lookback_days:
+        print("Not enough price history to backtest, at least " + str(lookback_days + 1) + " days are needed.")
+        return None
+
+    index_values = None
+    if history.index_ticker in price_history:
+        index_values = line_up(price_history[history.index_ticker], dates)
+    elif any(field == "beta" for field, symbol, value in screen):
+        # without the index every beta would be None and the screen would silently hold cash the whole time.
+        print("Can't backtest a screen on beta without the price history of " + history.index_name + ".")
+        return None
+
+    static_metrics = [screener.get_metrics(dict_of_stocks[ticker]) for ticker in tickers]
+    equity = [1.0]
+    holdings = []
+    last_day = len(dates) - 1
+    for rebalance_day in range(lookback_days, last_day, rebalance_days):
+        index_change = None
+        if index_values is not None and index_values[rebalance_day - lookback_days] is not None:
+            index_start = index_values[rebalance_day - lookback_days]
+            index_change = (index_values[rebalance_day] - index_start) / index_start * 100
+
+        selected = []
+        for i in range(len(tickers)):
+            start_price = prices[i][rebalance_day - lookback_days]
+            if start_price is None:  # not listed long enough
+                continue
+            change = (prices[i][rebalance_day] - start_price) / start_price * 100
+            metrics = dict(static_metrics[i])
+            metrics["price"] = prices[i][rebalance_day]
+            metrics["change"] = change
+            metrics["beta"] = change / index_change if index_change else None
+            if screener.passes_screen(metrics, screen):
+                selected.append(i)
+        holdings.append((dates[rebalance_day], [tickers[i] for i in selected]))
+
+        selected_prices = [prices[i] for i in selected]
+        for day in range(rebalance_day + 1, min(rebalance_day + rebalance_days, last_day) + 1):
+            if selected_prices:
+                portfolio_return = sum(column[day] / column[day - 1] for column in selected_prices) \
+                                   / len(selected_prices) - 1
+            else:
+                portfolio_return = 0.0
+            equity.append(equity[-1] * (1 + portfolio_return))
+
+    return {"dates": dates[lookback_days:], "equity": equity, "holdings": holdings,
+            "total_return": (equity[-1] - 1) * 100, "beta_index": index_values is not None}
+
+
+def backtest_analysis(dict_of_stocks, screen, rebalance_days=21, lookback_days=21, price_history=None):
+    """
+    Prints the result of a backtest.
+    :return: a string to the gui
+    """
+    result = backtest(dict_of_stocks, screen, rebalance_days, lookback_days, price_history)
+    if result is None:
+        return "Could not backtest the screen!"
+
+    gui_string_backtest = "Backtest of the screen from " + result["dates"][0] + " to " + result["dates"][-1] \
+                          + ", rebalanced every " + str(rebalance_days) + " trading days:\n"
+    if result["beta_index"]:
+        gui_string_backtest += "Beta is measured against " + history.index_name + " (" + history.index_ticker \
+                               + ") over the last " + str(lookback_days) + " trading days, lined up by date.\n"
+    for date, held_tickers in result["holdings"]:
+        gui_string_backtest += date + ": " + (", ".join(held_tickers) or "cash") + "\n"
+    gui_string_backtest += "Total return: " + str(round(result["total_return"], 2)) + "%\n"
+
+    print(gui_string_backtest)
+    return gui_string_backtest
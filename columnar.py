@@ -0,0 +1,117 @@
+# Exports the loaded stocks and their metrics as an Arrow or Parquet file (one column per field) that can be
+# opened directly in pandas or DuckDB, and imports such a file again as an offline data source.
+# Needs pyarrow (pip install pyarrow), the rest of the program works without it.
+
+# (column, Arrow type) of every column, the names are the ones used in the Stock class.
+column_types = [
+    ("ticker", "string"),
+    ("name", "string"),
+    ("price", "float64"),
+    ("opening_price", "float64"),
+    ("change", "float64"),
+    ("beta", "float64"),
+    ("price_earnings", "float64"),
+    ("price_sales", "float64"),
+    ("debt_equity_ratio", "float64"),
+    ("lowest_price", "float64"),
+    ("highest_price", "float64"),
+    ("thirty_day_prices", "list<float64>"),
+]
+
+
+def import_pyarrow():
+    """
+    Imports pyarrow only when it is needed.
+    :return: the pyarrow module or None if it is not installed.
+    """
+    try:
+        import pyarrow
+        import pyarrow.feather
+        import pyarrow.parquet
+    except ImportError:
+        print("Arrow/Parquet files need pyarrow, install it with: pip install pyarrow")
+        return None
+    return pyarrow
+
+
+def get_schema(pyarrow):
+    """
+    :param pyarrow: the pyarrow module.
+    :return: the Arrow schema of the exported files.
+    """
+    types = {"string": pyarrow.string(), "float64": pyarrow.float64(),
+             "list<float64>": pyarrow.list_(pyarrow.float64())}
+    return pyarrow.schema([(column, types[column_type]) for column, column_type in column_types])
+
+
+def stocks_to_table(dict_of_stocks, pyarrow):
+    """
+    Builds an Arrow table with one row per stock, filled one column at a time.
+    :param dict_of_stocks: the stocks loaded in the program.
+    :param pyarrow: the pyarrow module.
+    :return: a pyarrow Table.
+    """
+    tickers = list(dict_of_stocks)
+    stocks = [dict_of_stocks[ticker] for ticker in tickers]
+    columns = {"ticker": tickers}
+    for column in ["name", "price", "opening_price", "change", "beta", "price_earnings", "price_sales",
+                   "debt_equity_ratio", "thirty_day_prices"]:
+        columns[column] = [getattr(stock, column, None) for stock in stocks]
+    low_high_prices = [getattr(stock, "low_high_price", None) or [None, None] for stock in stocks]
+    columns["lowest_price"] = [low_high_price[0] for low_high_price in low_high_prices]
+    columns["highest_price"] = [low_high_price[1] for low_high_price in low_high_prices]
+    return pyarrow.Table.from_pydict(columns, schema=get_schema(pyarrow))
+
+
+def export_stocks(dict_of_stocks, file_name):
+    """
+    Saves the stocks as a Parquet file (file names ending with .parquet) or else as an Arrow (Feather) file.
+    :param dict_of_stocks: the stocks loaded in the program.
+    :param file_name: where to save.
+    :return: True if the file was saved, False if not.
+    """
+    pyarrow = import_pyarrow()
+    if pyarrow is None:
+        return False
+    try:
+        table = stocks_to_table(dict_of_stocks, pyarrow)
+        if file_name.endswith(".parquet"):
+            pyarrow.parquet.write_table(table, file_name, compression="zstd")
+        else:
+            pyarrow.feather.write_feather(table, file_name, compression="zstd")
+    except Exception as e:
+        print("Something went wrong exporting the stocks " + str(e))
+        return False
+    return True
+
+
+def import_stocks(stock_class, file_name):
+    """
+    Reads stocks from an Arrow or Parquet file made by export_stocks.
+    :param stock_class: the Stock class to create.
+    :param file_name: the file to read.
+    :return: a dictionary of stocks or None if the file could not be read.
+    """
+    pyarrow = import_pyarrow()
+    if pyarrow is None:
+        return None
+    try:
+        if file_name.endswith(".parquet"):
+            table = pyarrow.parquet.read_table(file_name)
+        else:
+            table = pyarrow.feather.read_table(file_name)
+        columns = table.select([column for column, column_type in column_types]).to_pydict()
+    except Exception as e:
+        print("Something went wrong importing the stocks, check the file " + str(e))
+        return None
+
+    dict_of_stocks = {}
+    for row in range(table.num_rows):
+        # the values are already calculated, so the Stock is filled in directly instead of loading it again.
+        stock = stock_class.__new__(stock_class)
+        for column in ["ticker", "name", "price", "opening_price", "change", "beta", "price_earnings",
+                       "price_sales", "debt_equity_ratio", "thirty_day_prices"]:
+            setattr(stock, column, columns[column][row])
+        stock.low_high_price = [columns["lowest_price"][row], columns["highest_price"][row]]
+        dict_of_stocks[stock.ticker] = stock
+    return dict_of_stocks
@@ -0,0 +1,235 @@
+import math
+import operator
+from array import array
+
+# Pairwise correlation between the stocks loaded in main4.py. Every function takes the dictionary of
+# Stock objects as a parameter so that both the CLI (main4.py) and the GUI (gui2.py) can use it.
+
+# (shrinkage, use_float32) -> (prices the matrix was made from, tickers, matrix), so matrices made with
+# different options don't push each other out of the cache.
+correlation_cache = {}
+# (threshold, shrinkage, use_float32) -> (prices the clusters were made from, clusters)
+cluster_cache = {}
+
+
+def get_daily_returns(prices):
+    """
+    Turns a list of prices (from old to recent) into a list of daily returns.
+    :param prices: list of closing prices, oldest first.
+    :return: a list of daily returns (one shorter than prices).
+    """
+    daily_returns = []
+    for i in range(1, len(prices)):
+        daily_returns.append((prices[i] - prices[i - 1]) / prices[i - 1])
+    return daily_returns
+
+
+def standardize_returns(daily_returns, use_float32):
+    """
+    Centers the returns around zero and scales them to length 1, so that the correlation between two stocks
+    is just the dot product of their standardized returns.
+    :param daily_returns: a list of daily returns.
+    :param use_float32: stores the result as 32-bit floats to halve the memory usage.
+    :return: an array with the standardized returns or None if the stock never moved.
+    """
+    mean = math.fsum(daily_returns) / len(daily_returns)
+    centered = [value - mean for value in daily_returns]
+    norm = math.sqrt(math.fsum(value * value for value in centered))
+    if norm == 0:  # a flat price series has no correlation with anything.
+        return None
+    return array("f" if use_float32 else "d", [value / norm for value in centered])
+
+
+def get_aligned_returns(dict_of_stocks, use_float32=False):
+    """
+    Collects the standardized returns of every stock with price history. All series are cut to the same
+    (most recent) number of days so that the same index means the same day for every stock.
+    :param dict_of_stocks: the stocks loaded in the program.
+    :param use_float32: stores the returns as 32-bit floats.
+    :return: a list of tickers and a list of return arrays in the same order.
+    """
+    price_series = {}
+    for ticker in dict_of_stocks:
+        prices = getattr(dict_of_stocks[ticker], "thirty_day_prices", None)
+        if prices is not None and len(prices) > 2:
+            price_series[ticker] = prices
+
+    if not price_series:
+        return [], []
+
+    days = min(len(prices) for prices in price_series.values())
+    tickers = []
+    rows = []
+    for ticker in price_series:
+        standardized = standardize_returns(get_daily_returns(price_series[ticker][-days:]), use_float32)
+        if standardized is None:
+            print("Could not calculate correlation for " + ticker + ", the price never changed.")
+            continue
+        tickers.append(ticker)
+        rows.append(standardized)
+    return tickers, rows
+
+
+def get_prices_key(dict_of_stocks):
+    """
+    :param dict_of_stocks: the stocks loaded in the program.
+    :return: the tickers and prices, used to know if a cached result is still valid.
+    """
+    return tuple((ticker, tuple(getattr(dict_of_stocks[ticker], "thirty_day_prices", None) or ()))
+                 for ticker in dict_of_stocks)
+
+
+def correlation_matrix(dict_of_stocks, shrinkage=0.0, use_float32=False):
+    """
+    Calculates the correlation between every pair of stocks. Only the upper half is calculated, the lower
+    half is mirrored. The result is cached until the loaded stocks or their prices change.
+    :param dict_of_stocks: the stocks loaded in the program.
+    :param shrinkage: between 0 and 1, pulls the correlations towards 0 (useful when there are few days of data).
+    :param use_float32: stores the matrix as 32-bit floats, which halves the memory (5000 stocks take 100 MB).
+    :return: a list of tickers and the matrix (a list of arrays, one row per ticker).
+    """
+    if not 0 <= shrinkage <= 1:
+        raise ValueError("shrinkage has to be between 0 and 1")
+
+    prices_key = get_prices_key(dict_of_stocks)
+    cached = correlation_cache.get((shrinkage, use_float32))
+    if cached is not None and cached[0] == prices_key:
+        return cached[1], cached[2]
+
+    tickers, rows = get_aligned_returns(dict_of_stocks, use_float32)
+    number_of_stocks = len(tickers)
+    type_code = "f" if use_float32 else "d"
+    matrix = [array(type_code, bytes(array(type_code).itemsize * number_of_stocks)) for _ in tickers]
+
+    for i in range(number_of_stocks):
+        row_i = rows[i]
+        matrix[i][i] = 1.0
+        for j in range(i + 1, number_of_stocks):
+            value = sum(map(operator.mul, row_i, rows[j])) * (1 - shrinkage)
+            matrix[i][j] = value
+            matrix[j][i] = value
+
+    correlation_cache[(shrinkage, use_float32)] = (prices_key, tickers, matrix)
+    return tickers, matrix
+
+
+def most_correlated(dict_of_stocks, ticker, count=5, shrinkage=0.0, use_float32=False):
+    """
+    Finds the stocks that move the most like the chosen stock, using the cached correlation matrix.
+    :param dict_of_stocks: the stocks loaded in the program.
+    :param ticker: the stock to compare with.
+    :param count: how many stocks to return.
+    :param shrinkage: passed on to correlation_matrix.
+    :param use_float32: passed on to correlation_matrix.
+    :return: a list of (ticker, correlation) sorted from highest to lowest, or None if the ticker is missing.
+    """
+    tickers, matrix = correlation_matrix(dict_of_stocks, shrinkage, use_float32)
+    if ticker not in tickers:
+        return None
+    row = matrix[tickers.index(ticker)]
+    others = [(tickers[j], row[j]) for j in range(len(tickers)) if tickers[j] != ticker]
+    others.sort(key=lambda pair: pair[1], reverse=True)
+    return others[:count]
+
+
+def cluster_stocks(dict_of_stocks, threshold=0.5, shrinkage=0.0, use_float32=False):
+    """
+    Groups the stocks with hierarchical (average linkage) clustering. Clusters are merged as long as their
+    average correlation is at least the threshold.
+    :param dict_of_stocks: the stocks loaded in the program.
+    :param threshold: the lowest average correlation allowed inside a cluster.
+    :param shrinkage: passed on to correlation_matrix.
+    :param use_float32: passed on to correlation_matrix.
+    :return: a list of clusters, each cluster is a list of tickers.
+    """
+    # clustering is slow for many stocks, so it is only done again when the stocks or their prices change.
+    prices_key = get_prices_key(dict_of_stocks)
+    cached = cluster_cache.get((threshold, shrinkage, use_float32))
+    if cached is not None and cached[0] == prices_key:
+        return cached[1]
+
+    tickers, matrix = correlation_matrix(dict_of_stocks, shrinkage, use_float32)
+    # the rows are updated while clusters are merged, so they are copied to keep the cached matrix intact.
+    # a similarity of -2 (lower than any correlation) keeps a cluster from being its own nearest neighbour.
+    similarity = [array(row.typecode, row) for row in matrix]
+    for i in range(len(tickers)):
+        similarity[i][i] = -2.0
+
+    members = {i: [i] for i in range(len(tickers))}
+    active = list(range(len(tickers)))  # clusters that can still be merged
+    finished = []  # clusters that can't reach the threshold with anything anymore
+    chain = []
+    # nearest neighbour chain: follow each cluster to its most similar cluster until two clusters are each
+    # other's nearest neighbour, then merge them. Average linkage gives the same result as always merging the
+    # globally most similar pair, but only needs one row scan per step instead of a scan of every pair.
+    while len(active) > 1:
+        if not chain:
+            chain.append(active[0])
+        a = chain[-1]
+        row = similarity[a]
+        b = max(active, key=row.__getitem__)
+        if len(chain) > 1 and row[chain[-2]] >= row[b]:  # on ties go back, so the chain can't go in circles.
+            b = chain[-2]
+        if len(chain) < 2 or b != chain[-2]:
+            chain.append(b)
+            continue
+
+        chain.pop()
+        chain.pop()
+        if row[b] < threshold:
+            # a and b are each other's best match and still below the threshold. With average linkage a merged
+            # cluster is never more similar than its most similar part, so neither of them can ever merge.
+            active.remove(a)
+            active.remove(b)
+            finished += [a, b]
+            continue
+
+        size_a = len(members[a])
+        size_b = len(members[b])
+        row_b = similarity[b]
+        for other in active:
+            if other != a and other != b:
+                # average linkage: the new similarity is the size weighted mean of the two old ones.
+                value = (row[other] * size_a + row_b[other] * size_b) / (size_a + size_b)
+                row[other] = value
+                similarity[other][a] = value
+        members[a] += members.pop(b)
+        similarity[b] = None  # the row of a merged cluster is not needed anymore.
+        active.remove(b)
+
+    clusters = [[tickers[i] for i in members[cluster]] for cluster in sorted(finished + active)]
+    cluster_cache[(threshold, shrinkage, use_float32)] = (prices_key, clusters)
+    return clusters
+
+
+def correlation_analysis(dict_of_stocks, ticker):
+    """
+    Prints the stocks most correlated to a ticker.
+    :param dict_of_stocks: the stocks loaded in the program.
+    :param ticker: the stock to compare with.
+    :return: a string to the gui
+    """
+    closest = most_correlated(dict_of_stocks, ticker)
+    if closest is None:
+        gui_string_correlation = "No price history to correlate " + ticker + " with!\n"
+    else:
+        gui_string_correlation = "Stocks most correlated to " + ticker + ":\n"
+        for other, value in closest:
+            gui_string_correlation += other + ": " + str(round(value, 2)) + "\n"
+
+    print(gui_string_correlation)
+    return gui_string_correlation
+
+
+def cluster_analysis(dict_of_stocks):
+    """
+    Prints the clusters of stocks that move together.
+    :param dict_of_stocks: the stocks loaded in the program.
+    :return: a string to the gui
+    """
+    gui_string_clusters = "Stocks that move together:\n"
+    for cluster in cluster_stocks(dict_of_stocks):
+        gui_string_clusters += ", ".join(cluster) + "\n"
+
+    print(gui_string_clusters)
+    return gui_string_clusters
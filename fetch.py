@@ -0,0 +1,91 @@
+import asyncio
+import requests
+from concurrent.futures import ThreadPoolExecutor
+from requests.adapters import HTTPAdapter
+
+# Fetches the API data for many tickers at the same time. All requests share one pool of connections and
+# the data for a ticker is handed over as soon as all of its endpoints have answered, so the first stocks
+# can be shown while the rest are still loading.
+
+
+def make_session(max_connections):
+    """
+    Creates a session that keeps its connections open so they can be reused between requests.
+    :param max_connections: how many connections the pool keeps open.
+    :return: a requests session.
+    """
+    session = requests.Session()
+    adapter = HTTPAdapter(pool_connections=max_connections, pool_maxsize=max_connections)
+    session.mount("https://", adapter)
+    session.mount("http://", adapter)
+    return session
+
+
+def get_json(session, url, ticker, information_type):
+    """
+    Gets one API response (this is run in a worker thread).
+    :param session: the shared session.
+    :param url: the url with the ticker filled in.
+    :param ticker: AAPL for Apple Inc. etc.
+    :param information_type: the name of the endpoint, only used for printing.
+    :return: the data that was requested.
+    """
+    response = session.get(url)
+
+    # same messages as main4.get_api_data, so the user can see the program is doing something.
+    if response.status_code == 200:
+        print(ticker + " " + information_type + ' found!')
+    elif response.status_code == 404:
+        print(ticker + " " + information_type + ' not found.')
+
+    return response.json()
+
+
+async def fetch_endpoint(session, executor, ticker, information_type, url):
+    """
+    Gets one endpoint for one ticker without blocking the other requests.
+    :return: the name of the endpoint and its data ({} if the request failed).
+    """
+    loop = asyncio.get_running_loop()
+    try:
+        stock_data = await loop.run_in_executor(executor, get_json, session, url.format(ticker), ticker,
+                                                information_type)
+    except Exception as e:
+        print("Something went wrong fetching " + information_type + " for " + ticker + " " + str(e))
+        stock_data = {}
+    return information_type, stock_data
+
+
+async def fetch_ticker(session, executor, ticker, api_urls):
+    """
+    Gets every endpoint for a ticker at the same time.
+    :return: the ticker and a dictionary with the data of every endpoint.
+    """
+    results = await asyncio.gather(*(fetch_endpoint(session, executor, ticker, information_type, url)
+                                     for information_type, url in api_urls.items()))
+    return ticker, dict(results)
+
+
+async def fetch_api_data(list_of_tickers, api_urls, max_connections=20):
+    """
+    Fetches all endpoints for all tickers concurrently and yields the data ticker by ticker, in the order
+    they finish. Requests are started in the order of the list, so the first tickers finish first.
+    :param list_of_tickers: the tickers to fetch.
+    :param api_urls: the endpoints to fetch, {} in the url is replaced by the ticker.
+    :param max_connections: how many requests can be running at the same time.
+    :return: yields (ticker, dictionary with the data of every endpoint).
+    """
+    session = make_session(max_connections)
+    # one worker per connection, the executor queues the requests in the order they were started.
+    executor = ThreadPoolExecutor(max_workers=max_connections)
+    tasks = []
+    try:
+        for ticker in list_of_tickers:
+            tasks.append(asyncio.ensure_future(fetch_ticker(session, executor, ticker, api_urls)))
+        for finished in asyncio.as_completed(tasks):
+            yield await finished
+    finally:
+        for task in tasks:  # if the caller stops early the remaining requests are cancelled.
+            task.cancel()
+        executor.shutdown(wait=False, cancel_futures=True)
+        session.close()
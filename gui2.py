@@ -1,5 +1,13 @@
 from tkinter import *
+import queue
+import threading
+import alerts
 import main4
+import correlation
+import session
+import symbols
+
+close_wait_seconds = 10  # how long closing the window waits for tickers that are still loading.
 
 
 class Application(Frame):
@@ -12,6 +20,10 @@ class Application(Frame):
         Frame.__init__(self, master)
         self.grid()
 
+        # stocks loaded online by the background thread, waiting to be shown.
+        self.loaded_stocks = queue.Queue()
+        self.loading_thread = None
+
         Label(self,
               text="Enter tickers to analyse or remove (separated by comma + space): "
               ).grid(row=0, column=0, sticky=W)
@@ -21,7 +33,7 @@ class Application(Frame):
         self.tickers.grid(row=0, column=1, sticky=W)
 
         self.bttn_get_tickers = Button(self,
-                                       text="Fetch information online! (If the program freezes it's loading.",
+                                       text="Fetch information online! (Stocks show up as they are loaded.)",
                                        command=self.bttn_get_ticker_cmd)
         self.bttn_get_tickers.grid(row=0, column=3, sticky=W)
 
@@ -52,6 +64,33 @@ class Application(Frame):
                                          command=self.technical_analysis)
         self.technical_analysis.grid(row=4, column=1, sticky=W)
 
+        self.correlation_analysis = Button(self,
+                                           text="Most correlated to first ticker in entry",
+                                           command=self.correlation_analysis)
+        self.correlation_analysis.grid(row=3, column=3, sticky=W)
+
+        self.cluster_analysis = Button(self,
+                                       text="Stocks that move together",
+                                       command=self.cluster_analysis)
+        self.cluster_analysis.grid(row=3, column=1, sticky=W)
+
+        Label(self, text="Alert (for example: beta > 1.5), ticker to watch (blank for all):"
+              ).grid(row=6, column=0, sticky=W)
+
+        self.alert_text = Entry(self, width=50)
+        self.alert_text.grid(row=6, column=1, sticky=W)
+
+        self.alert_ticker = Entry(self, width=10)
+        self.alert_ticker.grid(row=7, column=1, sticky=W)
+
+        self.add_alert = Button(self, text="Add alert (goes off when the stock is fetched again)",
+                                command=self.add_alert)
+        self.add_alert.grid(row=6, column=3, sticky=W)
+
+        self.name_lookup = Button(self, text="Find tickers by the company name in entry",
+                                  command=self.name_lookup)
+        self.name_lookup.grid(row=1, column=1, sticky=W)
+
         self.remove_stocks = Button(self, text="Remove stocks from 'Available Stocks'",
                                     command=self.remove_stock_from_dict)
         self.remove_stocks.grid(row=1, column=3, sticky=W)
@@ -69,15 +108,58 @@ class Application(Frame):
         Handles all the tickers that are entered in entry and loads them into the program.
         :return:
         """
+        if self.loading_thread is not None and self.loading_thread.is_alive():
+            self.error_message_label['text'] = "Still loading the last tickers, please wait!"
+            return
+
         list_of_tickers_online = self.tickers.get().upper().split(", ")
-        main4.load_stock_information(list_of_tickers_online, "online")
+        self.error_message_label['text'] = "Loading..."
+        self.analysis_display_left.delete(0.0, END)
+        # the network calls run in a thread so the window does not freeze, the stocks are passed back with a queue
+        # because tkinter may only be used from this thread.
+        self.loading_thread = threading.Thread(target=main4.fetch_stocks_online,
+                                               args=(list_of_tickers_online, self.loaded_stocks.put),
+                                               daemon=True)
+        self.loading_thread.start()
+        self.after(100, self.show_loaded_stocks, list_of_tickers_online)
+
+    def show_loaded_stocks(self, list_of_tickers_online):
+        """
+        Adds the stocks that have finished loading to the program and shows their fundamental data right away.
+        Runs every 100 ms until the loading thread is done.
+        :param list_of_tickers_online: the tickers that are being loaded.
+        :return:
+        """
+        finished = not self.loading_thread.is_alive()  # checked first so no stock put after it is missed.
+        while not self.loaded_stocks.empty():
+            stock = self.loaded_stocks.get()
+            alert_string = main4.store_stock(stock.ticker, stock)
+            # one stock with broken data must not stop the polling, or the rest would never be shown.
+            try:
+                if alert_string:
+                    self.analysis_display_right.insert(0.0, alert_string)
+                self.analysis_display_left.insert(END, str(stock.fundamental_analysis()))
+            except Exception as e:
+                print("Could not show " + stock.ticker + " " + str(e))
+            self.update_available_stocks()
 
-        if bool(main4.dict_of_stocks) is False:
+        if not finished:
+            self.after(100, self.show_loaded_stocks, list_of_tickers_online)
+        elif bool(main4.dict_of_stocks) is False:
             self.error_message_label['text'] = "Tickers entered do not exist! Try again!"
-
         else:
             self.error_message_handler(list_of_tickers_online)
 
+    def store_waiting_stocks(self):
+        """
+        Puts the stocks that are loaded but not shown yet in the program, so they are not lost when the window
+        is closed.
+        :return:
+        """
+        while not self.loaded_stocks.empty():
+            stock = self.loaded_stocks.get()
+            main4.store_stock(stock.ticker, stock)
+
     def update_available_stocks(self):
         """
         Function is used to change available stocks to them that are loaded in the program.
@@ -123,6 +205,47 @@ class Application(Frame):
         text_with_sorted_beta_values = main4.beta_values_sorted()
         self.analysis_display_right.insert(0.0, text_with_sorted_beta_values)
 
+    def correlation_analysis(self):
+        """
+        Shows the stocks most correlated to the first ticker in the entry.
+        :return:
+        """
+        self.analysis_display_right.delete(0.0, END)
+        ticker = self.tickers.get().upper().split(", ")[0]
+        text_with_correlation_data = correlation.correlation_analysis(main4.dict_of_stocks, ticker)
+        self.analysis_display_right.insert(0.0, text_with_correlation_data)
+
+    def cluster_analysis(self):
+        """
+        Shows the clusters of stocks that move together.
+        :return:
+        """
+        self.analysis_display_right.delete(0.0, END)
+        text_with_cluster_data = correlation.cluster_analysis(main4.dict_of_stocks)
+        self.analysis_display_right.insert(0.0, text_with_cluster_data)
+
+    def name_lookup(self):
+        """
+        Shows the tickers of the companies whose name matches the entry.
+        :return:
+        """
+        self.analysis_display_right.delete(0.0, END)
+        text_with_tickers = symbols.name_lookup_analysis(self.tickers.get())
+        self.analysis_display_right.insert(0.0, text_with_tickers)
+
+    def add_alert(self):
+        """
+        Registers the alert in the alert entry and shows all registered alerts.
+        :return:
+        """
+        ticker = self.alert_ticker.get().strip().upper()
+        if alerts.add_alerts_from_text(self.alert_text.get(), ticker or None) is None:
+            self.error_message_label['text'] = "Could not understand the alert! Try for example: beta > 1.5"
+        else:
+            self.error_message_label['text'] = "Alert added!"
+            self.analysis_display_right.delete(0.0, END)
+            self.analysis_display_right.insert(0.0, alerts.list_alerts())
+
     def error_message_handler(self, stock_list):
         """
         Tells the user is something is going wrong.
@@ -179,8 +302,26 @@ class Application(Frame):
             self.error_message_handler(ticker_choice_offline)
 
 
+def close_window():
+    """
+    Saves the loaded stocks for the next session and closes the window. Stocks that are still loading get
+    close_wait_seconds to finish, the ones that don't make it are left out of the session.
+    :return:
+    """
+    if my_app.loading_thread is not None and my_app.loading_thread.is_alive():
+        my_app.error_message_label['text'] = "Waiting for the last tickers before closing..."
+        root.update_idletasks()
+        my_app.loading_thread.join(timeout=close_wait_seconds)
+    my_app.store_waiting_stocks()
+    session.save_session(main4.dict_of_stocks)
+    root.destroy()
+
+
+main4.dict_of_stocks.update(session.restore_session(main4.Stock))
 root = Tk()
 root.title("Stock Screener")
 root.geometry("1300x600")
 my_app = Application(root)
+my_app.update_available_stocks()
+root.protocol("WM_DELETE_WINDOW", close_window)
 root.mainloop()
@@ -0,0 +1,115 @@
+import asyncio
+import datetime
+import json
+import fetch
+
+# Stores years of daily prices per ticker in price_history.json, so screens can be backtested over a longer
+# period than the 30 days the rest of the program uses. Prices are kept together with their dates, so that
+# different tickers (and the index) can be lined up by date.
+
+history_file = "price_history.json"
+# {} is replaced by the ticker and then by the first date to fetch.
+history_url = 'https://fmpcloud.io/api/v3/historical-price-full/{}?from={}&apikey=49c2cfa92e0bde3f68a80ef921d93bbd'
+# the index beta is measured against in backtests, the online tickers are from the USA.
+index_ticker = "^GSPC"
+index_name = "S&P 500"
+
+# ticker -> {"from": first date asked for, "fetched": date of the fetch, "dates": [...], "prices": [...]}
+# dates and prices go from old to recent.
+price_history = {}
+
+
+def load_price_history(file_name=history_file):
+    """
+    Reads the stored price history.
+    :param file_name: the history file.
+    :return: the price history (empty if there is no file).
+    """
+    if not price_history:
+        try:
+            with open(file_name, "r") as file:
+                price_history.update(json.load(file))
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            print("Could not read the price history " + str(e))
+    return price_history
+
+
+def save_price_history(file_name=history_file):
+    """
+    Writes the price history to file.
+    :param file_name: the history file.
+    :return: nothing
+    """
+    try:
+        with open(file_name, "w") as file:
+            json.dump(price_history, file)
+    except Exception as e:
+        print("Something went wrong saving the price history " + str(e))
+
+
+def parse_history(stock_data):
+    """
+    Takes the dates and adjusted closing prices out of a historical-price-full API response.
+    :param stock_data: the API response.
+    :return: a list of dates and a list of prices from old to recent, or None if there is no history.
+    """
+    try:
+        historical = sorted(stock_data["historical"], key=lambda day: day["date"])
+        dates = [day["date"] for day in historical]
+        prices = [float(day["adjClose"]) for day in historical]
+    except Exception as e:
+        print("Could not read the price history " + str(e))
+        return None
+    if not dates:
+        return None
+    return dates, prices
+
+
+def needs_update(ticker, start_date, today):
+    """
+    :return: True if the stored history of the ticker does not go back to start_date or was not fetched today.
+    """
+    stored = price_history.get(ticker)
+    return stored is None or stored["from"] > start_date or stored["fetched"] != today
+
+
+async def fetch_histories(list_of_tickers, start_date, today):
+    """
+    Fetches the histories concurrently and stores every ticker as soon as it has arrived.
+    :return: the tickers that were stored.
+    """
+    stored = []
+    urls = {"history": history_url.format("{}", start_date)}
+    async for ticker, api_data in fetch.fetch_api_data(list_of_tickers, urls):
+        history = parse_history(api_data["history"])
+        if history is None:
+            print("No price history found for " + ticker)
+            continue
+        price_history[ticker] = {"from": start_date, "fetched": today, "dates": history[0], "prices": history[1]}
+        stored.append(ticker)
+    return stored
+
+
+def update_price_history(list_of_tickers, years):
+    """
+    Makes sure the history of every ticker (and the index) goes back the given number of years, only tickers
+    that are missing or out of date are fetched.
+    :param list_of_tickers: the tickers to fetch.
+    :param years: how many years back.
+    :return: the tickers that were fetched.
+    """
+    load_price_history()
+    today = datetime.date.today()
+    start_date = today.replace(year=today.year - years, day=min(today.day, 28)).isoformat()
+    today = today.isoformat()
+
+    tickers_to_fetch = [ticker for ticker in list(list_of_tickers) + [index_ticker]
+                        if needs_update(ticker, start_date, today)]
+    if not tickers_to_fetch:
+        return []
+    print("Fetching " + str(years) + " years of prices for " + str(len(tickers_to_fetch)) + " tickers...\n")
+    fetched = asyncio.run(fetch_histories(tickers_to_fetch, start_date, today))
+    save_price_history()
+    return fetched
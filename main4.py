@@ -1,11 +1,30 @@
 import requests
 import json
 import sys
+import asyncio
+import alerts
+import backtest
+import columnar
+import correlation
+import fetch
+import history
+import screener
+import session
+import symbols
 
 # Written by Maximilian von Bonsdorff in 2020.
 
 dict_of_stocks = {}
 
+# The API endpoints, {} is replaced by the ticker. Note that all links are not the same.
+api_urls = {
+    "quote": 'https://fmpcloud.io/api/v3/quote/{}?apikey=49c2cfa92e0bde3f68a80ef921d93bbd',
+    "ratio": 'https://fmpcloud.io/api/v3/ratios/{}?period=quarter&apikey=49c2cfa92e0bde3f68a80ef921d93bbd',
+    "historical": 'https://fmpcloud.io/api/v3/historical-price-full/{}?timeseries=30&apikey=49c2cfa92e0bde3f6'
+                  '8a80ef921d93bbd',
+    "beta": 'https://fmpcloud.io/api/v3/company/profile/{}?apikey=49c2cfa92e0bde3f68a80ef921d93bbd'
+}
+
 
 class Stock:
     """
@@ -13,26 +32,30 @@ class Stock:
     a dictionary. API data from fmpcloud.io, local data downloaded from Yahoo Finance (finance.yahoo.com).
     """
 
-    def __init__(self, ticker, mode):
+    def __init__(self, ticker, mode, api_data=None):
         """
         Creates a Stock object
         :param ticker:
         - if data is imported from file, the name of the company
         - if data is imported online, the ticker (For instance, AAPL for Apple Inc.)
         :param mode: Whether the stock was imported offline or online
+        :param api_data: (online only) API responses that are already fetched, by endpoint name in api_urls.
+        Endpoints that are missing are fetched here.
         """
 
         if mode == "online":
+            if api_data is None:
+                api_data = {}
             self.ticker = ticker
-            self.name = get_company_name(ticker)
-            self.price = get_stock_price(ticker)
-            self.low_high_price = get_lowest_highest_prices(ticker)
-            self.opening_price = get_opening_price(ticker)
-            self.price_earnings = get_pe_ratio(ticker)
-            self.price_sales = get_ps_ratio(ticker)
-            self.beta = get_beta_value(ticker)
-            self.thirty_day_prices = get_historical_prices(ticker)
-            self.debt_equity_ratio = get_debt_equity_ratio(ticker)
+            self.name = get_company_name(ticker, api_data.get("quote"))
+            self.price = get_stock_price(ticker, api_data.get("quote"))
+            self.low_high_price = get_lowest_highest_prices(ticker, api_data.get("historical"))
+            self.opening_price = get_opening_price(ticker, api_data.get("historical"))
+            self.price_earnings = get_pe_ratio(ticker, api_data.get("ratio"))
+            self.price_sales = get_ps_ratio(ticker, api_data.get("ratio"))
+            self.beta = get_beta_value(ticker, api_data.get("beta"))
+            self.thirty_day_prices = get_historical_prices(ticker, api_data.get("historical"))
+            self.debt_equity_ratio = get_debt_equity_ratio(ticker, api_data.get("ratio"))
             self.thirty_day_change()
 
         if mode == "offline":
@@ -43,6 +66,9 @@ class Stock:
                 self.name = financial_data["company_name"]
                 self.price = float(financial_data["historical_prices_from_recent_to_old"][0])
                 self.sort_prices(financial_data)
+                # stored from old to recent, the same order as online data.
+                self.thirty_day_prices = [float(price_point) for price_point in
+                                          financial_data["historical_prices_from_recent_to_old"][29::-1]]
                 self.price_earnings = financial_data["price-earnings ratio"]
                 self.price_sales = financial_data["price-sales ratio"]
                 self.opening_price = float(financial_data["historical_prices_from_recent_to_old"][29])
@@ -167,14 +193,16 @@ def get_index_data_from_file():
     return read_index_data
 
 
-def get_company_name(ticker):
+def get_company_name(ticker, stock_data=None):
     """
     Grabs the company name associated with the ticker.
     :param ticker: AAPL for Apple Inc. etc.
+    :param stock_data: the API response if it is already fetched.
     :return: a string with company name
     """
     try:
-        stock_data = get_api_data("company_name", ticker)
+        if stock_data is None:
+            stock_data = get_api_data("company_name", ticker)
         company_name = stock_data[0]["name"]
 
     except Exception as e:
@@ -193,14 +221,9 @@ def get_api_data(information_type, ticker):
     """
 
     if information_type == "price" or information_type == "company_name":
-        url = 'https://fmpcloud.io/api/v3/quote/{}?apikey=49c2cfa92e0bde3f68a80ef921d93bbd'
-    if information_type == "ratio":
-        url = 'https://fmpcloud.io/api/v3/ratios/{}?period=quarter&apikey=49c2cfa92e0bde3f68a80ef921d93bbd'
-    if information_type == "historical":
-        url = 'https://fmpcloud.io/api/v3/historical-price-full/{}?timeseries=30&apikey=49c2cfa92e0bde3f6' \
-              '8a80ef921d93bbd'
-    if information_type == "beta":
-        url = 'https://fmpcloud.io/api/v3/company/profile/{}?apikey=49c2cfa92e0bde3f68a80ef921d93bbd'
+        url = api_urls["quote"]
+    else:
+        url = api_urls[information_type]
 
     response = requests.request('GET', url.format(ticker))  # call to get data with the correct url
 
@@ -215,15 +238,17 @@ def get_api_data(information_type, ticker):
     return stock_data
 
 
-def get_beta_value(ticker):
+def get_beta_value(ticker, stock_data=None):
     """
     Grabs beta value for the stock over the last 30 days.
     :param ticker: AAPL for Apple Inc. etc.
+    :param stock_data: the API response if it is already fetched.
     :return: beta value.
     """
 
     try:
-        stock_data = get_api_data("beta", ticker)
+        if stock_data is None:
+            stock_data = get_api_data("beta", ticker)
         beta_value = float(stock_data['profile']['beta'])
 
     except Exception as e:
@@ -236,14 +261,16 @@ def get_beta_value(ticker):
             return beta_value
 
 
-def get_opening_price(ticker):
+def get_opening_price(ticker, stock_data=None):
     """
   Grabs opening price 30 days ago.
   :param ticker: AAPL for Apple Inc. etc.
+  :param stock_data: the API response if it is already fetched.
   :return: the opening price.
   """
     try:
-        stock_data = get_api_data("historical", ticker)
+        if stock_data is None:
+            stock_data = get_api_data("historical", ticker)
         opening_price = stock_data['historical'][29]['open']
 
     except Exception as e:
@@ -253,15 +280,17 @@ def get_opening_price(ticker):
         return opening_price
 
 
-def get_lowest_highest_prices(ticker):
+def get_lowest_highest_prices(ticker, stock_data=None):
     """
   Grabs 30 day historical price action of a stock.
   :param ticker: AAPL for Apple Inc. etc.
+  :param stock_data: the API response if it is already fetched.
   :return: a list consisting of the lowest and highest price.
   """
 
     try:
-        stock_data = get_api_data("historical", ticker)
+        if stock_data is None:
+            stock_data = get_api_data("historical", ticker)
 
         historical_prices = []
         for i in range(0, 30):
@@ -278,14 +307,16 @@ def get_lowest_highest_prices(ticker):
         return lowest_highest_price
 
 
-def get_stock_price(ticker):
+def get_stock_price(ticker, stock_data=None):
     """
   Grabs the most recent price of a ticker.
   :param ticker: AAPL for Apple Inc. etc.
+  :param stock_data: the API response if it is already fetched.
   :return: the price of the stock.
   """
     try:
-        stock_data = get_api_data("price", ticker)
+        if stock_data is None:
+            stock_data = get_api_data("price", ticker)
         price = stock_data[0]['price']
 
     except Exception as e:
@@ -296,14 +327,16 @@ def get_stock_price(ticker):
         return price
 
 
-def get_pe_ratio(ticker):
+def get_pe_ratio(ticker, stock_data=None):
     """
   Grabs the latest quarterly price to earnings ratio of a company.
   :param ticker: AAPL for Apple Inc. etc.
+  :param stock_data: the API response if it is already fetched.
   :return: the PE of the stock.
   """
     try:
-        stock_data = get_api_data("ratio", ticker)
+        if stock_data is None:
+            stock_data = get_api_data("ratio", ticker)
         pe = stock_data[0]['priceEarningsRatio']
 
     except Exception as e:  # I have to expand this later
@@ -314,15 +347,17 @@ def get_pe_ratio(ticker):
         return pe
 
 
-def get_ps_ratio(ticker):
+def get_ps_ratio(ticker, stock_data=None):
     """
   Grabs the latest quarterly price to sales ratio of a company.
   :param ticker: AAPL for Apple Inc. etc.
+  :param stock_data: the API response if it is already fetched.
   :return: the P/S of the stock.
   """
     try:
 
-        stock_data = get_api_data("ratio", ticker)
+        if stock_data is None:
+            stock_data = get_api_data("ratio", ticker)
         ps = stock_data[0]['priceToSalesRatio']
 
     except Exception as e:  # I have to expand this later
@@ -333,14 +368,16 @@ def get_ps_ratio(ticker):
         return ps
 
 
-def get_debt_equity_ratio(ticker):
+def get_debt_equity_ratio(ticker, stock_data=None):
     """
   Grabs the debt equity ratio of the company (known in Swedish as "Soliditet")
   :param ticker: AAPL for Apple Inc. etc.
+  :param stock_data: the API response if it is already fetched.
   :return: the P/S of the stock.
   """
     try:
-        stock_data = get_api_data("ratio", ticker)
+        if stock_data is None:
+            stock_data = get_api_data("ratio", ticker)
         debt_equity = stock_data[0]['debtEquityRatio']
 
     except Exception as e:
@@ -351,14 +388,16 @@ def get_debt_equity_ratio(ticker):
         return debt_equity
 
 
-def get_historical_prices(ticker):
+def get_historical_prices(ticker, stock_data=None):
     """
     Gets the last 30 days closing price of a stock.
     :param ticker: AAPL for Apple Inc. etc.
+    :param stock_data: the API response if it is already fetched.
     :return: a list of historical prices.
     """
     try:
-        stock_data = get_api_data("historical", ticker)
+        if stock_data is None:
+            stock_data = get_api_data("historical", ticker)
         price_thirty_days = []
 
         for i in range(29, -1, -1):
@@ -372,24 +411,102 @@ def get_historical_prices(ticker):
         return price_thirty_days
 
 
-def ticker_check(ticker):
+def ticker_check(ticker, stock_data=None):
     """
     Checks that the ticker exists.
     :param ticker: AAPL as in Apple Inc. etc.
+    :param stock_data: the quote API response if it is already fetched.
     :return: returns the ticker if it existing or false if not.
     """
-    stock_data = get_api_data("company_name", ticker)
+    # a quote that is already fetched says more than the local symbol directory, so the directory is only used
+    # to skip the API call when nothing has been fetched yet.
+    if stock_data is None:
+        ticker_known = symbols.check_ticker(ticker)
+        if ticker_known is False:
+            return False
+        if ticker_known:
+            return ticker
+        stock_data = get_api_data("company_name", ticker)
     if not stock_data:  # checks if stock_data is empty
         print("Could not find information about ticker {} \n".format(ticker))
         return False
-    # API returns weird stuff when special characters are used in "ticker", this detects special characters:
-    if not ticker.isalnum():
-        print("Could not find information about ticker {} \n".format(ticker))
-        return False
     else:
         return ticker
 
 
+async def stream_stocks_online(list_of_stocks):
+    """
+    Fetches all tickers concurrently and yields every Stock as soon as its data has arrived.
+    :param list_of_stocks: a list of tickers.
+    :return: yields Stock objects, tickers that do not exist are skipped.
+    """
+    # every ticker is checked once: tickers the loaded symbol directory knows are wrong are not fetched, the
+    # others by their quote. Suggestions need the whole directory, so they wait until every ticker is done.
+    not_found = []
+    to_fetch = []
+    for ticker in list_of_stocks:
+        if symbols.known_ticker(ticker) is False:
+            print("Could not find information about ticker {} \n".format(ticker))
+            not_found.append(ticker)
+        else:
+            to_fetch.append(ticker)
+    async for ticker, api_data in fetch.fetch_api_data(to_fetch, api_urls):
+        if not ticker_check(ticker, api_data["quote"]):
+            not_found.append(ticker)
+            continue
+        stock = Stock(ticker, "online", api_data)
+        if stock.name is None:  # e.g. the API answered with an error message instead of a quote.
+            print("Could not find information about ticker {} \n".format(ticker))
+            continue
+        yield stock
+
+    for ticker in not_found:
+        if symbols.ticker_pattern.match(ticker):
+            symbols.print_suggestions(ticker)
+
+
+async def consume_stocks_online(list_of_stocks, stock_loaded):
+    """
+    Calls stock_loaded for every Stock that stream_stocks_online yields.
+    :return: nothing
+    """
+    async for stock in stream_stocks_online(list_of_stocks):
+        stock_loaded(stock)
+
+
+def fetch_stocks_online(list_of_stocks, stock_loaded):
+    """
+    Loads the tickers online, stock_loaded is called with every Stock as soon as it is ready so the results can
+    be shown before the slowest ticker has finished. Blocks until every ticker is done.
+    :param list_of_stocks: a list of tickers.
+    :param stock_loaded: a function that takes a Stock.
+    :return: nothing
+    """
+    asyncio.run(consume_stocks_online(list_of_stocks, stock_loaded))
+
+
+def store_stock(ticker, stock):
+    """
+    Puts a Stock in dict_of_stocks. If it replaces a Stock that was loaded before, the alerts are checked.
+    :param ticker: the key in dict_of_stocks.
+    :param stock: a Stock object.
+    :return: a string with the alerts that went off (empty if none).
+    """
+    alert_string = alerts.stock_updated(ticker, dict_of_stocks.get(ticker), stock)
+    dict_of_stocks[ticker] = stock
+    return alert_string
+
+
+def add_stock(stock):
+    """
+    Puts a Stock loaded online in dict_of_stocks and tells the user.
+    :param stock: a Stock object.
+    :return: nothing
+    """
+    store_stock(stock.ticker, stock)
+    print(stock.ticker + " (" + str(stock.name) + ") loaded!\n")
+
+
 def load_stock_information(list_of_stocks, mode):
     """
   Makes a Stock object of every stock present in the list.
@@ -401,19 +518,11 @@ def load_stock_information(list_of_stocks, mode):
 
     if mode == "online":
         print(please_wait_string)
-        for ticker in list_of_stocks:
-
-            ticker_exists = ticker_check(ticker)
-
-            if not ticker_exists:
-                continue
-
-            else:
-                dict_of_stocks[ticker] = Stock(ticker, mode)
+        fetch_stocks_online(list_of_stocks, add_stock)
 
     if mode == "offline":
         for ticker in list_of_stocks:
-            dict_of_stocks[ticker] = Stock(ticker, mode)
+            store_stock(ticker, Stock(ticker, mode))
 
 
 def check_int(choice):
@@ -559,6 +668,88 @@ def analysis_menu(menu_type):
         analysis_menu("{}".format(menu_type))
 
 
+def correlation_menu():
+    """
+    The menu that lets the user pick a stock and shows the stocks most correlated to it.
+    :return: nothing
+    """
+    print("--------- Correlation -----------")
+    print("Please choose a stock to find correlated stocks for:\n")
+
+    choice, choice_index, counter = choice_filter()
+
+    if choice is None or choice > counter + 1 or choice < 1:
+        print("That's not an option! \n")
+        correlation_menu()
+    elif choice == counter + 1:
+        main_menu()
+    else:
+        correlation.correlation_analysis(dict_of_stocks, choice_index[choice])
+        correlation_menu()
+
+
+def backtest_menu():
+    """
+    Asks for a screen, how many years to go back and how often to rebalance, then backtests the screen on the
+    loaded stocks. Price history that is missing is fetched online first.
+    :return: nothing
+    """
+    print("--------- Backtest -----------")
+    screen = None
+    while screen is None:
+        screen = screener.parse_screen(input("Enter a screen, for example: beta < 1, price_earnings < 15\n"
+                                             "Fields: " + ", ".join(screener.screen_fields) + "\n"))
+
+    years = None
+    while years is None or years < 1:
+        years = check_int(input("How many years back?\n"))
+
+    rebalance_days = None
+    while rebalance_days is None or rebalance_days < 1:
+        rebalance_days = check_int(input("Rebalance every how many trading days? (21 is about a month)\n"))
+
+    history.update_price_history(list(dict_of_stocks), years)
+    backtest.backtest_analysis(dict_of_stocks, screen, rebalance_days)
+    main_menu()
+
+
+def alerts_menu():
+    """
+    The menu for adding, listing and removing alerts. Alerts go off when stocks are imported again.
+    :return: nothing
+    """
+    print("--------- Alerts -----------")
+    print("1. Add alert\n"
+          "2. List alerts\n"
+          "3. Remove alert\n"
+          "4. Back\n")
+
+    choice = check_int(input("Please enter a choice: \n"))
+    if choice == 1:
+        alert_text = input("Enter when the alert should go off, for example: beta > 1.5, price_earnings < 15\n"
+                           "Fields: " + ", ".join(screener.screen_fields) + "\n")
+        ticker = input("Enter a ticker to watch (leave blank to watch all stocks): ").upper()
+        if alerts.add_alerts_from_text(alert_text, ticker or None) is not None:
+            print("Alert added!\n")
+        alerts_menu()
+    elif choice == 2:
+        alerts.list_alerts()
+        alerts_menu()
+    elif choice == 3:
+        alert_id = check_int(input("Enter the number of the alert to remove: \n"))
+        if alert_id in alerts.alerts_by_id:
+            alerts.remove_alert(alert_id)
+            print("Alert removed!\n")
+        else:
+            print("No such alert!\n")
+        alerts_menu()
+    elif choice == 4:
+        main_menu()
+    else:
+        print("Please select an existing option! \n")
+        alerts_menu()
+
+
 def check_if_dict_of_stocks_is_empty(mode):
     """
     To check if the dict of stocks is empty, for not launching program without data.
@@ -586,7 +777,10 @@ def setup_menu():
         choice = check_int(input("Where do you want to get data?\n"
                                  "1. Online\n"
                                  "2. Locally\n"
-                                 "3. Quit\n"))
+                                 "3. From an Arrow/Parquet file\n"
+                                 "4. Update the list of available tickers\n"
+                                 "5. Find a ticker by company name\n"
+                                 "6. Quit\n"))
 
         if choice == 1:
             while True:
@@ -614,13 +808,40 @@ def setup_menu():
                 break
 
         if choice == 3:
-            print("Thanks for using the stock screener!")
-            sys.exit()
+            file_name = input("Enter the name of the file (.parquet, or .arrow for Arrow files): ")
+            imported_stocks = columnar.import_stocks(Stock, file_name)
+            if imported_stocks is not None:
+                for ticker in imported_stocks:
+                    store_stock(ticker, imported_stocks[ticker])
+            check_if_dict_of_stocks_is_empty("offline")
+
+        if choice == 4:
+            if symbols.refresh_symbol_directory():
+                print("The list of tickers is updated, " + str(len(symbols.symbol_directory)) + " tickers found.\n")
+            setup_menu()
+
+        if choice == 5:
+            symbols.name_lookup_analysis(input("Enter the company name (for example: Apple): "))
+            setup_menu()
+
+        if choice == 6:
+            quit_program()
         else:
             print("Choose an existing option! ")
             setup_menu()
 
 
+def quit_program():
+    """
+    Saves the loaded stocks so the next session can start with them, then quits.
+    :return: nothing
+    """
+    if session.save_session(dict_of_stocks):
+        print("Saved " + str(len(dict_of_stocks)) + " stocks for next time.")
+    print("Thanks for using the stock screener!")
+    sys.exit()
+
+
 def main_menu():
     """
     Lists all types of information the program can provide and asks for a choice.
@@ -631,7 +852,12 @@ def main_menu():
           "2. Technical Analysis\n"
           "3. Stocks sorted by beta value\n"
           "4. Import more stocks online/offline\n"
-          "5. Quit\n")
+          "5. Most correlated stocks\n"
+          "6. Backtest a screen\n"
+          "7. Alerts\n"
+          "8. Export to Arrow/Parquet file\n"
+          "9. Stocks that move together\n"
+          "10. Quit\n")
 
     choice = check_int(input("Please enter a choice: \n"))
     if choice == 1:
@@ -644,8 +870,21 @@ def main_menu():
     if choice == 4:
         setup_menu()
     if choice == 5:
-        print("Thanks for using the stock screener!")
-        sys.exit()
+        correlation_menu()
+    if choice == 6:
+        backtest_menu()
+    if choice == 7:
+        alerts_menu()
+    if choice == 8:
+        file_name = input("Enter the name of the file (.parquet, or .arrow for Arrow files): ")
+        if columnar.export_stocks(dict_of_stocks, file_name):
+            print("Exported " + str(len(dict_of_stocks)) + " stocks to " + file_name + "\n")
+        main_menu()
+    if choice == 9:
+        correlation.cluster_analysis(dict_of_stocks)
+        main_menu()
+    if choice == 10:
+        quit_program()
 
     else:
         print("Please select an existing option! \n")
@@ -654,4 +893,9 @@ def main_menu():
 
 if __name__ == "__main__":
     print("Welcome to the stock screener!\n")
-    setup_menu()
+    dict_of_stocks.update(session.restore_session(Stock))
+    if dict_of_stocks:
+        print("Restored " + str(len(dict_of_stocks)) + " stocks from last session.\n")
+        main_menu()
+    else:
+        setup_menu()
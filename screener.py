@@ -0,0 +1,76 @@
+import operator
+
+# Screens are written like "beta < 1, price_earnings < 15" and are used to pick out the stocks that match.
+# A parsed screen is a list of (field, operator, value), the fields are the names used in the Stock class.
+
+screen_fields = ["price", "change", "beta", "price_earnings", "price_sales", "debt_equity_ratio"]
+
+screen_operators = {
+    "<=": operator.le,
+    ">=": operator.ge,
+    "<": operator.lt,
+    ">": operator.gt,
+    "==": operator.eq,
+}
+
+
+def parse_screen(screen_text):
+    """
+    Turns a screen written by the user into a list of conditions.
+    :param screen_text: for example "beta < 1, price_earnings < 15".
+    :return: a list of (field, operator, value) or None if the screen could not be understood.
+    """
+    screen = []
+    for condition in screen_text.split(","):
+        condition = condition.strip()
+        # the two character operators are tried first so that "<=" is not read as "<".
+        for symbol in sorted(screen_operators, key=len, reverse=True):
+            if symbol in condition:
+                field, value = condition.split(symbol, 1)
+                field = field.strip().lower()
+                break
+        else:
+            print("Could not understand the condition '" + condition + "'")
+            return None
+
+        if field not in screen_fields:
+            print(field + " can't be screened. Choose one of: " + ", ".join(screen_fields))
+            return None
+        try:
+            screen.append((field, symbol, float(value)))
+        except ValueError:
+            print(value.strip() + " is not a number!")
+            return None
+    return screen
+
+
+def get_metrics(stock):
+    """
+    Collects the fields that can be screened from a Stock.
+    :param stock: a Stock object.
+    :return: a dictionary with one value per field in screen_fields (None if the stock has no value).
+    """
+    return {field: getattr(stock, field, None) for field in screen_fields}
+
+
+def passes_screen(metrics, screen):
+    """
+    Checks if a stock matches every condition of the screen. Missing values never match.
+    :param metrics: a dictionary like the one from get_metrics.
+    :param screen: a parsed screen.
+    :return: True or False
+    """
+    for field, symbol, value in screen:
+        if metrics[field] is None or not screen_operators[symbol](metrics[field], value):
+            return False
+    return True
+
+
+def screen_stocks(dict_of_stocks, screen):
+    """
+    Finds the loaded stocks that match the screen.
+    :param dict_of_stocks: the stocks loaded in the program.
+    :param screen: a parsed screen.
+    :return: a list of tickers.
+    """
+    return [ticker for ticker in dict_of_stocks if passes_screen(get_metrics(dict_of_stocks[ticker]), screen)]
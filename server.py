@@ -0,0 +1,302 @@
+import json
+import secrets
+import sys
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlparse
+
+import alerts
+import main4
+import screener
+
+# A local service that keeps one set of loaded stocks in memory for everyone, so every analyst does not have to
+# load the same tickers and spend their own API calls. Start it with "python server.py [port]".
+#
+# GET  /stocks                       tickers that are loaded
+# GET  /fundamentals                 debt/equity, P/E and P/S of every stock
+# GET  /technicals                   monthly return, beta, lowest and highest price of every stock
+# GET  /beta                         stocks sorted by beta, highest first
+# GET  /screen?q=beta<1,price_earnings<15    tickers that pass the screen
+# POST /load  {"tickers": ["AAPL"], "mode": "online"}    loads tickers (leave tickers empty offline to load all)
+# GET  /alerts                       registered alerts
+# POST /alerts {"alert": "beta > 1.5", "ticker": "AAPL"}   registers alerts (leave ticker out to watch all)
+# DELETE /alerts?id=1                removes an alert
+#
+# Alerts go off when a load replaces a stock, the ones that went off are returned in the "alerts" of /load.
+# Loading never changes the stocks that are being read: a new snapshot is made and swapped in when it is done.
+# Every response has an ETag, a client that sends it back in If-None-Match gets 304 until the stocks change.
+
+host = "127.0.0.1"
+port = 8000
+
+# the snapshot that is served: (version, dictionary of stocks). It is replaced, never changed.
+snapshot = (0, {})
+load_lock = threading.Lock()  # only one load (or change of alerts) at a time, readers never wait for it.
+response_cache = {}  # (path, version) -> body, so the same answer is only calculated once per snapshot.
+# part of every ETag, so an ETag from before a restart never matches the new versions.
+process_token = secrets.token_hex(4)
+
+
+def stock_fundamentals(stocks):
+    """
+    :param stocks: a snapshot dictionary of stocks.
+    :return: the fundamental data of every stock.
+    """
+    return {ticker: {"name": stock.name,
+                     "debt_equity_ratio": stock.debt_equity_ratio,
+                     "price_earnings": stock.price_earnings,
+                     "price_sales": stock.price_sales}
+            for ticker, stock in stocks.items()}
+
+
+def stock_technicals(stocks):
+    """
+    :param stocks: a snapshot dictionary of stocks.
+    :return: the technical data of every stock.
+    """
+    technicals = {}
+    for ticker, stock in stocks.items():
+        low_high_price = stock.low_high_price or [None, None]
+        technicals[ticker] = {"name": stock.name,
+                              "change": stock.change,
+                              "beta": stock.beta,
+                              "lowest_price": low_high_price[0],
+                              "highest_price": low_high_price[1]}
+    return technicals
+
+
+def beta_ranking(stocks):
+    """
+    :param stocks: a snapshot dictionary of stocks.
+    :return: a list of {"ticker", "beta"} sorted from highest to lowest beta, missing betas last.
+    """
+    with_beta = [ticker for ticker in stocks if stocks[ticker].beta is not None]
+    without_beta = [ticker for ticker in stocks if stocks[ticker].beta is None]
+    with_beta.sort(key=lambda ticker: stocks[ticker].beta, reverse=True)
+    return [{"ticker": ticker, "beta": stocks[ticker].beta} for ticker in with_beta + without_beta]
+
+
+def load_stocks(list_of_tickers, mode):
+    """
+    Loads tickers into a copy of the current snapshot and swaps it in when every ticker is done.
+    :param list_of_tickers: the tickers to load.
+    :param mode: online or offline.
+    :return: the tickers that were loaded and the alerts that went off, or None if the local files could not be
+    read (then nothing is changed).
+    """
+    with load_lock:
+        version, stocks = snapshot
+        new_stocks = dict(stocks)
+        loaded = {}
+
+        if mode == "online":
+            main4.fetch_stocks_online(list_of_tickers, lambda stock: loaded.update({stock.ticker: stock}))
+        else:
+            available_stocks = main4.display_local_information()
+            if available_stocks is None:
+                return None
+            for ticker in main4.get_stocks_choice_offline(list_of_tickers or [""], available_stocks):
+                # Stock falls back to the interactive setup menu when the files can't be read, which would
+                # block the service, so the files are checked first.
+                if main4.get_financial_data_from_file(ticker) is None:
+                    return None
+                loaded[ticker] = main4.Stock(ticker, mode)
+
+        alert_string = ""
+        changed = False
+        for ticker, stock in loaded.items():
+            old_stock = new_stocks.get(ticker)
+            if old_stock is not None and vars(old_stock) == vars(stock):
+                continue
+            alert_string += alerts.stock_updated(ticker, old_stock, stock)
+            new_stocks[ticker] = stock
+            changed = True
+        if changed:  # the same data again changes nothing, so the clients' ETags stay valid.
+            set_snapshot(new_stocks)
+    return list(loaded), alert_string.splitlines()
+
+
+def alert_list():
+    """
+    :return: the registered alerts.
+    """
+    return [{"id": alert_id, "field": field, "direction": direction, "threshold": threshold, "ticker": ticker,
+             "strict": strict}
+            for alert_id, (field, direction, threshold, ticker, strict) in list(alerts.alerts_by_id.items())]
+
+
+def make_etag(version):
+    """
+    :param version: the version of a snapshot.
+    :return: the ETag of the snapshot.
+    """
+    return '"' + process_token + "-" + str(version) + '"'
+
+
+def set_snapshot(stocks):
+    """
+    Swaps in a new snapshot and forgets the responses of the old ones.
+    :param stocks: the new dictionary of stocks, it must not be changed afterwards.
+    :return: nothing
+    """
+    global snapshot
+    snapshot = (snapshot[0] + 1, stocks)
+    response_cache.clear()
+
+
+class ScreenerHandler(BaseHTTPRequestHandler):
+    """
+    Answers the requests, every request is handled in its own thread.
+    """
+
+    def send_json(self, status, data, etag=None):
+        """
+        Sends data as JSON.
+        :return: nothing
+        """
+        body = data if isinstance(data, bytes) else json.dumps(data).encode()
+        self.send_response(status)
+        self.send_header("Content-Type", "application/json")
+        self.send_header("Content-Length", str(len(body)))
+        if etag is not None:
+            self.send_header("ETag", etag)
+        self.end_headers()
+        self.wfile.write(body)
+
+    def do_GET(self):
+        """
+        Answers the read endpoints from the current snapshot.
+        :return: nothing
+        """
+        if urlparse(self.path).path == "/alerts":  # alerts are not part of the snapshot, so never cached.
+            self.send_json(200, alert_list())
+            return
+
+        version, stocks = snapshot  # one snapshot for the whole request, even if a load finishes meanwhile.
+        etag = make_etag(version)
+        if self.headers.get("If-None-Match") == etag:
+            self.send_response(304)
+            self.send_header("ETag", etag)
+            self.end_headers()
+            return
+
+        url = urlparse(self.path)
+        cache_key = (self.path, version)
+        body = response_cache.get(cache_key)
+        if body is None:
+            if url.path == "/stocks":
+                data = {"version": version, "stocks": list(stocks)}
+            elif url.path == "/fundamentals":
+                data = stock_fundamentals(stocks)
+            elif url.path == "/technicals":
+                data = stock_technicals(stocks)
+            elif url.path == "/beta":
+                data = beta_ranking(stocks)
+            elif url.path == "/screen":
+                screen = screener.parse_screen(parse_qs(url.query).get("q", [""])[0])
+                if screen is None:
+                    self.send_json(400, {"error": "Could not understand the screen"})
+                    return
+                data = screener.screen_stocks(stocks, screen)
+            else:
+                self.send_json(404, {"error": "No such endpoint"})
+                return
+            body = json.dumps(data).encode()
+            response_cache[cache_key] = body
+
+        self.send_json(200, body, etag)
+
+    def read_json(self):
+        """
+        :return: the JSON body of the request.
+        """
+        return json.loads(self.rfile.read(int(self.headers.get("Content-Length", 0))) or b"{}")
+
+    def do_POST(self):
+        """
+        Loads tickers or registers alerts, the readers keep getting the old snapshot until a load is done.
+        :return: nothing
+        """
+        path = urlparse(self.path).path
+        if path == "/alerts":
+            self.add_alerts()
+            return
+        if path != "/load":
+            self.send_json(404, {"error": "No such endpoint"})
+            return
+        try:
+            request = self.read_json()
+            tickers = request.get("tickers", [])
+            # a plain string would be loaded one character at a time.
+            if not isinstance(tickers, list) or not all(isinstance(ticker, str) for ticker in tickers):
+                raise ValueError("tickers has to be a list of strings")
+            list_of_tickers = [ticker.upper() for ticker in tickers]
+            mode = request.get("mode", "online")
+        except Exception as e:
+            self.send_json(400, {"error": "Could not read the request " + str(e)})
+            return
+        if mode not in ("online", "offline"):
+            self.send_json(400, {"error": "mode has to be online or offline"})
+            return
+
+        result = load_stocks(list_of_tickers, mode)
+        if result is None:
+            self.send_json(500, {"error": "Could not read the local files, nothing was loaded"})
+            return
+        loaded, triggered_alerts = result
+        version = snapshot[0]
+        self.send_json(200, {"version": version, "loaded": loaded, "alerts": triggered_alerts}, make_etag(version))
+
+    def add_alerts(self):
+        """
+        Registers the alerts in the request.
+        :return: nothing
+        """
+        try:
+            request = self.read_json()
+            alert_text = request["alert"]
+            ticker = request.get("ticker")
+            if not isinstance(alert_text, str):
+                raise ValueError("alert has to be a string")
+            if ticker is not None and not isinstance(ticker, str):
+                raise ValueError("ticker has to be a string")
+            ticker = ticker.upper() if ticker else None
+        except Exception as e:
+            self.send_json(400, {"error": "Could not read the request " + str(e)})
+            return
+
+        with load_lock:  # a load that is checking alerts must not see them half added.
+            alert_ids = alerts.add_alerts_from_text(alert_text, ticker)
+        if alert_ids is None:
+            self.send_json(400, {"error": "Could not understand the alert"})
+        else:
+            self.send_json(200, {"ids": alert_ids})
+
+    def do_DELETE(self):
+        """
+        Removes an alert.
+        :return: nothing
+        """
+        url = urlparse(self.path)
+        if url.path != "/alerts":
+            self.send_json(404, {"error": "No such endpoint"})
+            return
+        try:
+            alert_id = int(parse_qs(url.query)["id"][0])
+        except (KeyError, ValueError):
+            self.send_json(400, {"error": "An alert id is needed, for example /alerts?id=1"})
+            return
+
+        with load_lock:
+            if alert_id not in alerts.alerts_by_id:
+                self.send_json(404, {"error": "No such alert"})
+                return
+            alerts.remove_alert(alert_id)
+        self.send_json(200, {"removed": alert_id})
+
+
+if __name__ == "__main__":
+    if len(sys.argv) > 1:
+        port = int(sys.argv[1])
+    print("Stock screener service running on http://{}:{}/".format(host, port))
+    ThreadingHTTPServer((host, port), ScreenerHandler).serve_forever()
@@ -0,0 +1,101 @@
+import json
+import os
+import struct
+import zlib
+
+# Saves the loaded stocks when the program is closed and restores them on the next start, so they don't have
+# to be loaded online again. The file starts with a header and an index of where every stock is stored, the
+# stocks themselves are only read (hydrated) the first time they are used.
+#
+# File layout: header (magic, format version, index length), index (json: ticker -> [offset, length]),
+# then one zlib compressed json record per stock.
+
+session_file = "session.bss"
+magic = b"BSSS"
+file_format_version = 1
+header = struct.Struct("<4sHI")
+
+
+class LazyStock:
+    """
+    Stands in for a Stock that is restored from the session file. The first time any attribute is used the
+    record is read, and the object turns into a real Stock.
+    """
+
+    def __init__(self, stock_class, record):
+        """
+        :param stock_class: the Stock class to turn into.
+        :param record: the compressed bytes of the stock.
+        """
+        self.__dict__["session_record"] = (stock_class, record)
+
+    def __getattr__(self, name):
+        """
+        Only called when the attribute is missing, which means the stock has not been hydrated yet.
+        """
+        session_record = self.__dict__.pop("session_record", None)
+        if session_record is None:
+            raise AttributeError(name)
+        stock_class, record = session_record
+        self.__dict__.update(json.loads(zlib.decompress(record)))
+        self.__class__ = stock_class
+        return getattr(self, name)
+
+
+def save_session(dict_of_stocks, file_name=session_file):
+    """
+    Writes every loaded stock to the session file.
+    :param dict_of_stocks: the stocks loaded in the program.
+    :param file_name: where to save.
+    :return: True if the session was saved, False if not.
+    """
+    try:
+        index = {}
+        records = []
+        offset = 0
+        for ticker in dict_of_stocks:
+            session_record = vars(dict_of_stocks[ticker]).get("session_record")
+            if session_record is not None:  # restored but never used, saved again as it is.
+                record = bytes(session_record[1])
+            else:
+                record = zlib.compress(json.dumps(vars(dict_of_stocks[ticker])).encode())
+            index[ticker] = [offset, len(record)]
+            records.append(record)
+            offset += len(record)
+
+        index_bytes = json.dumps(index).encode()
+        temporary_file_name = file_name + ".tmp"
+        with open(temporary_file_name, "wb") as file:
+            file.write(header.pack(magic, file_format_version, len(index_bytes)))
+            file.write(index_bytes)
+            file.writelines(records)
+        os.replace(temporary_file_name, file_name)  # the old session is kept if writing fails halfway.
+    except Exception as e:
+        print("Something went wrong saving the session " + str(e))
+        return False
+    return True
+
+
+def restore_session(stock_class, file_name=session_file):
+    """
+    Reads the index of the session file. The stocks are hydrated when they are first used.
+    :param stock_class: the Stock class the restored stocks turn into.
+    :param file_name: the session file.
+    :return: a dictionary of stocks (empty if there is no session to restore).
+    """
+    if not os.path.exists(file_name):
+        return {}
+    try:
+        with open(file_name, "rb") as file:
+            data = file.read()
+        file_magic, version, index_length = header.unpack_from(data)
+        if file_magic != magic or version != file_format_version:
+            print("The session file is from another version of the program, it will not be restored.")
+            return {}
+        index = json.loads(data[header.size:header.size + index_length])
+        records = memoryview(data)[header.size + index_length:]
+        return {ticker: LazyStock(stock_class, records[offset:offset + length])
+                for ticker, (offset, length) in index.items()}
+    except Exception as e:
+        print("Something went wrong restoring the session " + str(e))
+        return {}
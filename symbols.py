@@ -0,0 +1,254 @@
+import difflib
+import json
+import os
+import re
+import time
+import requests
+
+# A local directory of every ticker the API knows about, so tickers can be checked without calling the API.
+# The directory is read from symbols.json. If the file is missing or older than max_age_days it is downloaded
+# again in bulk and saved, so new listings are not rejected forever.
+
+symbol_list_url = 'https://fmpcloud.io/api/v3/stock/list?apikey=49c2cfa92e0bde3f68a80ef921d93bbd'
+max_age_days = 7
+
+# tickers are letters and digits, share classes and exchanges are written like BRK.B or BRK-B.
+ticker_pattern = re.compile(r"^[A-Z0-9]+([.-][A-Z0-9]+)*$")
+
+symbol_directory = {}  # ticker -> company name
+ticker_trie = {}  # one nested dictionary per character, "$" holds the ticker that ends there.
+name_trie = {}  # the same for every word of the company names, "$" holds a list of tickers.
+tried_loading = False  # so a missing directory is only downloaded once per session.
+
+
+def add_to_trie(trie, key, value):
+    """
+    Adds a value to the trie under key.
+    :param trie: ticker_trie or name_trie.
+    :param key: the string to index.
+    :param value: the ticker.
+    :return: nothing
+    """
+    node = trie
+    for character in key:
+        node = node.setdefault(character, {})
+    node.setdefault("$", []).append(value)
+
+
+def search_trie(trie, prefix, limit):
+    """
+    Finds the values of all keys that start with prefix.
+    :param trie: ticker_trie or name_trie.
+    :param prefix: the beginning of the key.
+    :param limit: the maximum number of values to return.
+    :return: a list of tickers, shortest keys first.
+    """
+    node = trie
+    for character in prefix:
+        if character not in node:
+            return []
+        node = node[character]
+
+    found = []
+    level = [node]
+    while level and len(found) < limit:  # breadth first so that exact and short matches come first.
+        next_level = []
+        for node in level:
+            for character in sorted(node):
+                if character == "$":
+                    for ticker in node["$"]:
+                        if ticker not in found:
+                            found.append(ticker)
+                else:
+                    next_level.append(node[character])
+        level = next_level
+    return found[:limit]
+
+
+def build_symbol_directory(list_of_symbols):
+    """
+    Replaces the directory and indexes with the given symbols.
+    :param list_of_symbols: a list of dictionaries with "ticker" and "company_name".
+    :return: nothing
+    """
+    symbol_directory.clear()
+    ticker_trie.clear()
+    name_trie.clear()
+    for symbol in list_of_symbols:
+        ticker = symbol["ticker"].upper()
+        company_name = symbol["company_name"] or ""
+        symbol_directory[ticker] = company_name
+        add_to_trie(ticker_trie, ticker, ticker)
+        for word in company_name.upper().split():
+            add_to_trie(name_trie, word, ticker)
+
+
+def load_symbol_directory(file_name="symbols.json"):
+    """
+    Reads the symbol directory from file.
+    :param file_name: a json file with a list of {"ticker": ..., "company_name": ...}.
+    :return: True if the directory was loaded, False if not.
+    """
+    try:
+        with open(file_name, "r") as file:
+            build_symbol_directory(json.load(file))
+    except Exception as e:
+        print("Could not read the symbol directory " + str(e))
+        return False
+    return True
+
+
+def refresh_symbol_directory(file_name="symbols.json"):
+    """
+    Downloads every available ticker in one API call and saves them to file.
+    :param file_name: where the directory is saved.
+    :return: True if the directory was refreshed, False if not.
+    """
+    try:
+        response = requests.request('GET', symbol_list_url)
+        list_of_symbols = []
+        for symbol in response.json():
+            list_of_symbols.append({"ticker": symbol["symbol"], "company_name": symbol.get("name")})
+        if not list_of_symbols:
+            return False
+        with open(file_name, "w") as file:
+            json.dump(list_of_symbols, file)
+    except Exception as e:
+        print("Something went wrong downloading the symbol directory " + str(e))
+        return False
+
+    build_symbol_directory(list_of_symbols)
+    return True
+
+
+def directory_is_outdated(file_name="symbols.json"):
+    """
+    :param file_name: the symbol directory file.
+    :return: True if the file is missing or older than max_age_days.
+    """
+    if not os.path.exists(file_name):
+        return True
+    return time.time() - os.path.getmtime(file_name) > max_age_days * 24 * 60 * 60
+
+
+def get_symbol_directory(file_name="symbols.json"):
+    """
+    Loads the symbol directory the first time it is needed. An outdated or missing file is downloaded again,
+    if that fails the old file is used anyway.
+    :param file_name: the symbol directory file.
+    :return: the directory (empty if it could not be loaded).
+    """
+    global tried_loading
+    if not symbol_directory and not tried_loading:
+        tried_loading = True
+        if not directory_is_outdated(file_name) and load_symbol_directory(file_name):
+            return symbol_directory
+        if not refresh_symbol_directory(file_name) and os.path.exists(file_name):
+            load_symbol_directory(file_name)
+    return symbol_directory
+
+
+def suggest_tickers(text, limit=5):
+    """
+    Finds tickers that the user might have meant: tickers starting with the text, company names starting
+    with the text and tickers that are spelled almost the same.
+    :param text: what the user entered.
+    :param limit: the maximum number of suggestions.
+    :return: a list of tickers.
+    """
+    text = text.upper()
+    suggestions = search_trie(ticker_trie, text, limit)
+    words = text.split()
+    for ticker in search_trie(name_trie, words[0], limit) if words else []:
+        if ticker not in suggestions:
+            suggestions.append(ticker)
+    for ticker in difflib.get_close_matches(text, symbol_directory, n=limit):
+        if ticker not in suggestions:
+            suggestions.append(ticker)
+    return suggestions[:limit]
+
+
+def find_tickers_by_name(company_name, limit=10):
+    """
+    Looks up tickers by company name. Every word entered has to be the start of a word in the name, so
+    "apple" finds Apple Inc. and "gen mot" finds General Motors Company.
+    :param company_name: the name (or part of it) the user entered.
+    :param limit: the maximum number of tickers.
+    :return: a list of (ticker, company name), shortest matching words first.
+    """
+    directory = get_symbol_directory()
+    words = company_name.upper().split()
+    if not words:
+        return []
+    found = search_trie(name_trie, words[0], len(directory))
+    for word in words[1:]:
+        matching_word = set(search_trie(name_trie, word, len(directory)))
+        found = [ticker for ticker in found if ticker in matching_word]
+    return [(ticker, directory[ticker]) for ticker in found[:limit]]
+
+
+def name_lookup_analysis(company_name):
+    """
+    Prints the tickers of the companies matching a name.
+    :param company_name: the name (or part of it) the user entered.
+    :return: a string to the gui
+    """
+    matches = find_tickers_by_name(company_name)
+    if not matches:
+        gui_string_lookup = "No company called " + company_name + " found!\n"
+    else:
+        gui_string_lookup = "Tickers of companies called " + company_name + ":\n"
+        for ticker, name in matches:
+            gui_string_lookup += ticker + " (" + name + ")\n"
+
+    print(gui_string_lookup)
+    return gui_string_lookup
+
+
+def known_ticker(ticker):
+    """
+    Checks a ticker against the directory that is already loaded, never reads or downloads it, so it can be
+    used before every request without slowing the first one down.
+    :param ticker: AAPL as in Apple Inc. etc.
+    :return: True if the ticker exists, False if it does not, None if that is not known.
+    """
+    # API returns weird stuff when special characters are used in "ticker", so those are stopped here.
+    if not ticker_pattern.match(ticker):
+        return False
+    if not symbol_directory:
+        return None
+    return ticker in symbol_directory
+
+
+def print_suggestions(ticker):
+    """
+    Prints the tickers the user might have meant instead of a ticker that was not found.
+    :param ticker: the ticker that was not found.
+    :return: nothing
+    """
+    directory = get_symbol_directory()
+    if ticker in directory:  # the ticker exists, it was the API that failed.
+        return
+    suggestions = suggest_tickers(ticker)
+    if suggestions:
+        print(ticker + ", did you mean: " + ", ".join(suggestion + " (" + directory[suggestion] + ")"
+                                                      for suggestion in suggestions) + "\n")
+
+
+def check_ticker(ticker):
+    """
+    Checks a ticker without using the network (unless the directory has to be downloaded), the user gets
+    suggestions if it does not exist.
+    :param ticker: AAPL as in Apple Inc. etc.
+    :return: True if the ticker exists, False if it does not, None if there is no directory to check with.
+    """
+    known = known_ticker(ticker)
+    if known is None:
+        if not get_symbol_directory():
+            return None
+        known = ticker in symbol_directory
+    if not known:
+        print("Could not find information about ticker {} \n".format(ticker))
+        if ticker_pattern.match(ticker):
+            print_suggestions(ticker)
+    return known